@@ -1,22 +1,41 @@
+import hashlib
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import PREDICTION_KEY, cache_get, cache_set
 from app.core.database import get_db
 from app.models.schemas import PredictionRequest, PredictionResponse
-from app.services.predictor import PredictorService
+from app.services.predictor import PredictorService, get_predictor
 
 router = APIRouter()
-predictor_service = PredictorService()
+
+# Identical requests within this window reuse the cached result
+PREDICTION_CACHE_TTL = 60
 
 @router.post("/predict", response_model=PredictionResponse)
 async def create_prediction(
     request: PredictionRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    predictor_service: PredictorService = Depends(get_predictor)
 ):
     """
     Create a prediction based on input data
     """
     try:
-        result = predictor_service.predict(request.data)
+        digest = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        cache_key = PREDICTION_KEY.format(
+            model_version=request.model_version, digest=digest
+        )
+
+        result = await cache_get(cache_key)
+        if result is None:
+            # Inference is blocking; keep it off the event loop
+            result = await run_in_threadpool(predictor_service.predict, request.data)
+            await cache_set(cache_key, result, PREDICTION_CACHE_TTL)
         
         # TODO: Save prediction to database
         # prediction = Prediction(
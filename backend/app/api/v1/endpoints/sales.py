@@ -3,17 +3,97 @@ Sales Data API Endpoints
 CRUD operations for processed sales data
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.core.database import AsyncSessionLocal
-from app.models.prediction import SalesData
+from sqlalchemy.orm import raiseload
+
+from app.core.cache import SALE_KEY, SALES_SUMMARY_KEY, cache
+from app.core.database import (
+    EXACT_COUNT_THRESHOLD,
+    estimate_count,
+    fast_count,
+    get_db,
+)
+from app.models.prediction import SalesData, SalesSummary
+from app.models.schemas import SalesOut
+from app.services.processing_pipeline import ProcessingPipeline
 
 router = APIRouter()
 
+# Columns returned by the sales list endpoints, in response order
+SALES_COLUMNS = (
+    SalesData.id,
+    SalesData.upload_id,
+    SalesData.date,
+    SalesData.sku_id,
+    SalesData.sales_quantity,
+    SalesData.sales_revenue,
+    SalesData.stock_level,
+    SalesData.category,
+    SalesData.unit_price,
+    SalesData.created_at,
+)
+UPLOAD_SALES_COLUMNS = (
+    SalesData.id,
+    SalesData.date,
+    SalesData.sku_id,
+    SalesData.sales_quantity,
+    SalesData.sales_revenue,
+    SalesData.stock_level,
+    SalesData.category,
+    SalesData.unit_price,
+)
+
+# Rows fetched per round trip when streaming a page
+STREAM_BATCH_SIZE = 200
+
+
+async def _fetch_page(
+    db: AsyncSession, columns: Sequence, filters: List, skip: int, limit: int
+) -> Tuple[int, bool, List[Dict[str, Any]]]:
+    """
+    Fetch one page of sales rows, newest first, with the matching total
+
+    Large result sets report the planner's row estimate instead of counting
+    every match; smaller ones get an exact count() OVER () in the same query.
+
+    Returns:
+        (total, total_is_estimate, records)
+    """
+    if filters:
+        estimate = await estimate_count(db, select(SalesData.id).where(*filters))
+    else:
+        estimate = await fast_count(db, SalesData.__tablename__)
+    approximate = estimate is not None and estimate >= EXACT_COUNT_THRESHOLD
+
+    selected = columns if approximate else (*columns, func.count().over())
+    # Server-side cursor: rows arrive in batches instead of one buffered list
+    result = await db.stream(
+        select(*selected)
+        .where(*filters)
+        .order_by(SalesData.date.desc())
+        .offset(skip)
+        .limit(limit)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+    # Zipping against the column names drops the trailing window total
+    keys = [column.key for column in columns]
+    records = []
+    total = 0
+    async for row in result:
+        records.append(dict(zip(keys, row)))
+        if not approximate:
+            total = row[-1]
+
+    if approximate:
+        return estimate, True, records
+    return total, False, records
+
 
 @router.get("/sales")
 async def list_sales(
@@ -21,6 +101,7 @@ async def list_sales(
     sku_id: Optional[str] = Query(None, description="Filter by SKU ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     List sales data with optional filtering
@@ -31,74 +112,41 @@ async def list_sales(
     - skip: Pagination offset
     - limit: Number of results (max 1000)
     """
-    async with AsyncSessionLocal() as session:
-        # Build query
-        query = select(SalesData)
-
-        if upload_id:
-            query = query.where(SalesData.upload_id == upload_id)
-        if sku_id:
-            query = query.where(SalesData.sku_id == sku_id)
-
-        # Get total count
-        count_query = select(func.count()).select_from(SalesData)
-        if upload_id:
-            count_query = count_query.where(SalesData.upload_id == upload_id)
-        if sku_id:
-            count_query = count_query.where(SalesData.sku_id == sku_id)
-
-        total_result = await session.execute(count_query)
-        total = total_result.scalar()
-
-        # Get paginated results
-        query = query.order_by(SalesData.date.desc()).offset(skip).limit(limit)
-        result = await session.execute(query)
-        sales = result.scalars().all()
-
-        return {
+    filters = []
+    if upload_id:
+        filters.append(SalesData.upload_id == upload_id)
+    if sku_id:
+        filters.append(SalesData.sku_id == sku_id)
+
+    total, approximate, sales = await _fetch_page(
+        db, SALES_COLUMNS, filters, skip, limit
+    )
+
+    # orjson serializes the datetime values natively
+    return ORJSONResponse(
+        {
             "total": total,
+            "total_is_estimate": approximate,
             "skip": skip,
             "limit": limit,
-            "sales": [
-                {
-                    "id": s.id,
-                    "upload_id": s.upload_id,
-                    "date": s.date.isoformat() if s.date else None,
-                    "sku_id": s.sku_id,
-                    "sales_quantity": s.sales_quantity,
-                    "sales_revenue": s.sales_revenue,
-                    "stock_level": s.stock_level,
-                    "category": s.category,
-                    "unit_price": s.unit_price,
-                    "created_at": s.created_at.isoformat() if s.created_at else None,
-                }
-                for s in sales
-            ],
+            "sales": sales,
         }
+    )
 
 
-@router.get("/sales/{sale_id}")
-async def get_sale(sale_id: int):
+@router.get("/sales/{sale_id}", response_model=SalesOut)
+@cache(key=SALE_KEY, ttl=300)
+async def get_sale(sale_id: int, db: AsyncSession = Depends(get_db)):
     """Get a single sales record by ID"""
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(SalesData).where(SalesData.id == sale_id))
-        sale = result.scalar_one_or_none()
+    result = await db.execute(
+        select(SalesData).options(raiseload("*")).where(SalesData.id == sale_id)
+    )
+    sale = result.scalar_one_or_none()
 
-        if not sale:
-            raise HTTPException(status_code=404, detail="Sale record not found")
+    if not sale:
+        raise HTTPException(status_code=404, detail="Sale record not found")
 
-        return {
-            "id": sale.id,
-            "upload_id": sale.upload_id,
-            "date": sale.date.isoformat() if sale.date else None,
-            "sku_id": sale.sku_id,
-            "sales_quantity": sale.sales_quantity,
-            "sales_revenue": sale.sales_revenue,
-            "stock_level": sale.stock_level,
-            "category": sale.category,
-            "unit_price": sale.unit_price,
-            "created_at": sale.created_at.isoformat() if sale.created_at else None,
-        }
+    return SalesOut.model_validate(sale)
 
 
 @router.get("/uploads/{upload_id}/sales")
@@ -106,111 +154,65 @@ async def get_sales_by_upload(
     upload_id: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Get all sales data for a specific upload
 
     This is useful for viewing processed data from a specific file upload.
     """
-    async with AsyncSessionLocal() as session:
-        # Get total count for this upload
-        count_result = await session.execute(
-            select(func.count())
-            .select_from(SalesData)
-            .where(SalesData.upload_id == upload_id)
-        )
-        total = count_result.scalar()
-
-        # Get sales data
-        result = await session.execute(
-            select(SalesData)
-            .where(SalesData.upload_id == upload_id)
-            .order_by(SalesData.date.desc())
-            .offset(skip)
-            .limit(limit)
-        )
-        sales = result.scalars().all()
+    total, approximate, sales = await _fetch_page(
+        db, UPLOAD_SALES_COLUMNS, [SalesData.upload_id == upload_id], skip, limit
+    )
 
-        return {
+    return ORJSONResponse(
+        {
             "upload_id": upload_id,
             "total": total,
+            "total_is_estimate": approximate,
             "skip": skip,
             "limit": limit,
-            "sales": [
-                {
-                    "id": s.id,
-                    "date": s.date.isoformat() if s.date else None,
-                    "sku_id": s.sku_id,
-                    "sales_quantity": s.sales_quantity,
-                    "sales_revenue": s.sales_revenue,
-                    "stock_level": s.stock_level,
-                    "category": s.category,
-                    "unit_price": s.unit_price,
-                }
-                for s in sales
-            ],
+            "sales": sales,
         }
+    )
 
 
 @router.get("/uploads/{upload_id}/sales/summary")
-async def get_sales_summary(upload_id: str):
+@cache(key=SALES_SUMMARY_KEY, ttl=3600)
+async def get_sales_summary(upload_id: str, db: AsyncSession = Depends(get_db)):
     """
     Get summary statistics for sales data of a specific upload
 
     Returns aggregated metrics like total revenue, total quantity, etc.
+    Read from the sales_summary row written at the end of processing.
+    Cached per upload; invalidated when the upload is (re)processed.
     """
-    async with AsyncSessionLocal() as session:
-        # Check if upload has sales data
-        result = await session.execute(
-            select(func.count())
-            .select_from(SalesData)
-            .where(SalesData.upload_id == upload_id)
-        )
-        total_records = result.scalar()
-
-        if total_records == 0:
-            return {
-                "upload_id": upload_id,
-                "total_records": 0,
-                "message": "No sales data found for this upload",
-            }
-
-        # Get summary stats
-        result = await session.execute(
-            select(
-                func.count().label("total_records"),
-                func.sum(SalesData.sales_quantity).label("total_quantity"),
-                func.sum(SalesData.sales_revenue).label("total_revenue"),
-                func.avg(SalesData.sales_quantity).label("avg_quantity"),
-                func.avg(SalesData.sales_revenue).label("avg_revenue"),
-                func.count(func.distinct(SalesData.sku_id)).label("unique_skus"),
-            ).where(SalesData.upload_id == upload_id)
-        )
-        stats = result.one()
-
-        # Get date range
-        date_result = await session.execute(
-            select(
-                func.min(SalesData.date).label("min_date"),
-                func.max(SalesData.date).label("max_date"),
-            ).where(SalesData.upload_id == upload_id)
-        )
-        date_range = date_result.one()
-
+    summary = await db.get(SalesSummary, upload_id)
+    if summary is None:
+        # Uploads processed before summaries existed are aggregated once here
+        await ProcessingPipeline(db).refresh_summary(upload_id)
+        await db.commit()
+        summary = await db.get(SalesSummary, upload_id)
+
+    if summary is None:
         return {
             "upload_id": upload_id,
-            "total_records": total_records,
-            "summary": {
-                "total_quantity": float(stats.total_quantity or 0),
-                "total_revenue": float(stats.total_revenue or 0),
-                "average_quantity": float(stats.avg_quantity or 0),
-                "average_revenue": float(stats.avg_revenue or 0),
-                "unique_skus": stats.unique_skus,
-            },
-            "date_range": {
-                "start": date_range.min_date.isoformat()
-                if date_range.min_date
-                else None,
-                "end": date_range.max_date.isoformat() if date_range.max_date else None,
-            },
+            "total_records": 0,
+            "message": "No sales data found for this upload",
         }
+
+    return {
+        "upload_id": upload_id,
+        "total_records": summary.total_records,
+        "summary": {
+            "total_quantity": float(summary.total_quantity or 0),
+            "total_revenue": float(summary.total_revenue or 0),
+            "average_quantity": float(summary.avg_quantity or 0),
+            "average_revenue": float(summary.avg_revenue or 0),
+            "unique_skus": summary.unique_skus,
+        },
+        "date_range": {
+            "start": summary.min_date.isoformat() if summary.min_date else None,
+            "end": summary.max_date.isoformat() if summary.max_date else None,
+        },
+    }
@@ -4,14 +4,30 @@ Upload API Endpoints
 
 import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import pandas as pd
-from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    HTTPException,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse
 from sqlalchemy import func, select
-
-from app.core.database import AsyncSessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
+
+from app.core.cache import SALES_SUMMARY_KEY, UPLOAD_KEY, cache, cache_delete
+from app.core.database import (
+    EXACT_COUNT_THRESHOLD,
+    AsyncSessionLocal,
+    fast_count,
+    get_db,
+)
 from app.models.prediction import RawUpload
 from app.services.data_processor import DataProcessor
 from app.services.data_upload import UploadService
@@ -22,153 +38,211 @@ from app.services.schema_detector import SchemaDetector
 router = APIRouter()
 
 
+def _analyze_file(file_path: Path, content: Optional[bytes] = None) -> Dict[str, Any]:
+    """Read, profile and validate an uploaded file (blocking, CPU bound)"""
+    # 1. Read file (from memory when the upload's bytes are still at hand)
+    df = DataProcessor.read_file(file_path, content=content)
+
+    # 2. Clean column names
+    df = DataProcessor.clean_column_names(df)
+
+    # 3. Infer and convert types
+    df = DataProcessor.infer_and_convert_types(df)
+
+    # 4. Fill missing values with appropriate defaults
+    # NOTE: Commented out for now - will be used in Phase 2 processing pipeline
+    # df = DataProcessor.fill_missing_values(df)
+
+    # 5. Detect schema
+    schema = SchemaDetector.detect_schema(df)
+
+    # 6. Validate data
+    validation = DataValidator.validate_data(df, schema)
+
+    # 7. Generate preview
+    preview = SchemaDetector.generate_preview(df, rows=10)
+
+    return {
+        "row_count": len(df),
+        "column_count": len(df.columns),
+        "schema": schema,
+        "validation": validation,
+        "preview": preview,
+    }
+
+
+async def _process_upload_async(
+    upload_id: str, file_path: Path, content: Optional[bytes] = None
+) -> None:
+    """Background task: analyze a saved upload and record the results"""
+    try:
+        analysis = await run_in_threadpool(_analyze_file, file_path, content)
+        error = None
+    except Exception as e:
+        analysis = None
+        error = f"Error processing file: {str(e)}"
+
+    async with AsyncSessionLocal() as session:
+        upload = await session.get(RawUpload, upload_id)
+        if not upload:
+            return
+
+        if analysis:
+            try:
+                upload.row_count = analysis["row_count"]
+                upload.column_count = analysis["column_count"]
+                upload.detected_schema = analysis["schema"]
+                upload.validation_report = analysis["validation"]
+                upload.preview = analysis["preview"]
+                upload.status = "uploaded"
+                await session.commit()
+            except Exception as e:
+                # Never leave the upload stuck in "processing"
+                await session.rollback()
+                error = f"Error saving analysis: {str(e)}"
+
+        if error:
+            # Cleanup on error
+            UploadService.delete_file(file_path)
+            upload.status = "error"
+            upload.error_message = error
+            await session.commit()
+
+    await cache_delete(UPLOAD_KEY.format(upload_id=upload_id))
+
+
 @router.post("/upload")
 async def upload_file(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     description: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Upload a data file (CSV, XLSX, XLS, TXT)
 
+    The file is stored and registered immediately; reading, schema
+    detection and validation run in the background. Poll
+    GET /uploads/{upload_id} until the status leaves "processing".
+
     Returns:
         {
             "upload_id": "uuid",
             "filename": "sales_data.csv",
-            "status": "uploaded",
-            "schema": {...},
-            "validation": {...},
-            "preview": [...]
+            "status": "processing"
         }
     """
     # Generate upload ID
     upload_id = str(uuid.uuid4())
 
-    try:
-        # 1. Save file
-        file_path = await UploadService.save_upload_file(file, upload_id)
-
-        # 2. Read file
-        df = DataProcessor.read_file(file_path)
-
-        # 3. Clean column names
-        df = DataProcessor.clean_column_names(df)
-
-        # 4. Infer and convert types
-        df = DataProcessor.infer_and_convert_types(df)
-
-        # 5. Fill missing values with appropriate defaults
-        # NOTE: Commented out for now - will be used in Phase 2 processing pipeline
-        # df = DataProcessor.fill_missing_values(df)
-
-        # 6. Detect schema
-        schema = SchemaDetector.detect_schema(df)
-
-        # 5. Validate data
-        validation = DataValidator.validate_data(df, schema)
-
-        # 6. Generate preview
-        preview = SchemaDetector.generate_preview(df, rows=10)
-
-        # 7. Save to database (async)
-        async with AsyncSessionLocal() as session:
-            upload_record = RawUpload(
-                id=upload_id,
-                filename=file.filename,
-                file_path=str(file_path),
-                file_size_bytes=file_path.stat().st_size,
-                row_count=len(df),
-                column_count=len(df.columns),
-                detected_schema=schema,
-                validation_report=validation,
-                status="uploaded",
-            )
-            session.add(upload_record)
-            await session.commit()
-
-        return {
-            "upload_id": upload_id,
-            "filename": file.filename,
-            "status": "uploaded",
-            "row_count": len(df),
-            "column_count": len(df.columns),
-            "schema": schema,
-            "validation": validation,
-            "preview": preview,
-        }
+    # Save file (validates extension, size and content type)
+    file_path, content = await UploadService.save_upload_file(file, upload_id)
 
-    except HTTPException:
-        raise
+    try:
+        upload_record = RawUpload(
+            id=upload_id,
+            filename=file.filename,
+            file_path=str(file_path),
+            file_size_bytes=len(content),
+            status="processing",
+        )
+        db.add(upload_record)
+        await db.commit()
     except Exception as e:
         # Cleanup on error
         UploadService.delete_file(file_path)
-        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error saving upload: {str(e)}")
 
+    # The file stays on disk for processing; analysis parses the bytes in hand
+    background_tasks.add_task(_process_upload_async, upload_id, file_path, content)
 
-@router.get("/uploads/{upload_id}")
-async def get_upload_status(upload_id: str):
-    """Get upload status and details"""
-    async with AsyncSessionLocal() as session:
-        upload = await session.get(RawUpload, upload_id)
-        if not upload:
-            raise HTTPException(status_code=404, detail="Upload not found")
+    return {
+        "upload_id": upload_id,
+        "filename": file.filename,
+        "status": "processing",
+    }
 
-        return {
-            "upload_id": upload.id,
-            "filename": upload.filename,
-            "status": upload.status,
-            "row_count": upload.row_count,
-            "schema": upload.detected_schema,
-            "validation": upload.validation_report,
-            "uploaded_at": upload.uploaded_at,
-        }
+
+@router.get("/uploads/{upload_id}")
+@cache(
+    key=UPLOAD_KEY,
+    ttl=60,
+    condition=lambda upload: upload["status"] != "processing",
+)
+async def get_upload_status(upload_id: str, db: AsyncSession = Depends(get_db)):
+    """Get upload status and details (cached once analysis has finished)"""
+    upload = await db.get(RawUpload, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    return {
+        "upload_id": upload.id,
+        "filename": upload.filename,
+        "status": upload.status,
+        "row_count": upload.row_count,
+        "column_count": upload.column_count,
+        "schema": upload.detected_schema,
+        "validation": upload.validation_report,
+        "preview": upload.preview,
+        "error_message": upload.error_message,
+        "uploaded_at": upload.uploaded_at,
+    }
 
 
 @router.get("/uploads")
-async def list_uploads(skip: int = 0, limit: int = 10):
+async def list_uploads(
+    skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)
+):
     """List all uploads without schema details"""
-    async with AsyncSessionLocal() as session:
-        # Get total count
-        count_result = await session.execute(
-            select(func.count()).select_from(RawUpload)
-        )
-        total = count_result.scalar()
-
-        # Get uploads with pagination
-        result = await session.execute(
-            select(RawUpload)
-            .order_by(RawUpload.uploaded_at.desc())
-            .offset(skip)
-            .limit(limit)
-        )
+    # Past a few thousand uploads the planner estimate is good enough
+    estimate = await fast_count(db, RawUpload.__tablename__)
+    approximate = estimate is not None and estimate >= EXACT_COUNT_THRESHOLD
+
+    query = (
+        select(RawUpload)
+        .options(raiseload("*"))
+        .order_by(RawUpload.uploaded_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    if approximate:
+        result = await db.execute(query)
+        total = estimate
         uploads = result.scalars().all()
+    else:
+        # Exact total in the same query
+        result = await db.execute(query.add_columns(func.count().over()))
+        rows = result.all()
+        total = rows[0][-1] if rows else 0
+        uploads = [row.RawUpload for row in rows]
+
+    # Format response without schema
+    upload_list = []
+    for upload in uploads:
+        upload_list.append(
+            {
+                "upload_id": upload.id,
+                "filename": upload.filename,
+                "status": upload.status,
+                "row_count": upload.row_count,
+                "column_count": upload.column_count,
+                "uploaded_at": upload.uploaded_at,
+                "processed_at": upload.processed_at,
+                "validation": upload.validation_report,
+            }
+        )
 
-        # Format response without schema
-        upload_list = []
-        for upload in uploads:
-            upload_list.append(
-                {
-                    "upload_id": upload.id,
-                    "filename": upload.filename,
-                    "status": upload.status,
-                    "row_count": upload.row_count,
-                    "column_count": upload.column_count,
-                    "uploaded_at": upload.uploaded_at,
-                    "processed_at": upload.processed_at,
-                    "validation": upload.validation_report,
-                }
-            )
-
-        return {
-            "total": total,
-            "skip": skip,
-            "limit": limit,
-            "uploads": upload_list,
-        }
+    return {
+        "total": total,
+        "total_is_estimate": approximate,
+        "skip": skip,
+        "limit": limit,
+        "uploads": upload_list,
+    }
 
 
 @router.post("/uploads/process")
-async def process_upload(body: dict):
+async def process_upload(body: dict, db: AsyncSession = Depends(get_db)):
     """
     Process uploaded file and save to sales_data table
 
@@ -178,31 +252,37 @@ async def process_upload(body: dict):
     if not upload_id:
         raise HTTPException(status_code=400, detail="upload_id is required")
 
-    async with AsyncSessionLocal() as session:
-        upload = await session.get(RawUpload, upload_id)
-        if not upload:
-            raise HTTPException(status_code=404, detail="Upload not found")
+    upload = await db.get(RawUpload, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.status == "processing":
+        raise HTTPException(status_code=409, detail="Upload is still being processed")
 
-        pipeline = ProcessingPipeline(session)
+    pipeline = ProcessingPipeline(db)
 
-        try:
-            stats = await pipeline.process_upload(
-                upload_id, column_mapping=upload.column_mapping
-            )
+    try:
+        stats = await pipeline.process_upload(
+            upload_id, column_mapping=upload.column_mapping
+        )
 
-            return {
-                "upload_id": upload_id,
-                "status": "processed",
-                "rows_processed": stats["rows_processed"],
-                "rows_inserted": stats["rows_inserted"],
-                "message": "Data processed successfully",
-            }
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        return {
+            "upload_id": upload_id,
+            "status": "processed",
+            "rows_processed": stats["rows_processed"],
+            "rows_inserted": stats["rows_inserted"],
+            "message": "Data processed successfully",
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await cache_delete(
+            SALES_SUMMARY_KEY.format(upload_id=upload_id),
+            UPLOAD_KEY.format(upload_id=upload_id),
+        )
 
 
 @router.post("/uploads/preview")
-async def preview_processing(body: dict):
+async def preview_processing(body: dict, db: AsyncSession = Depends(get_db)):
     """
     Preview how the data will look after processing
 
@@ -212,24 +292,26 @@ async def preview_processing(body: dict):
     if not upload_id:
         raise HTTPException(status_code=400, detail="upload_id is required")
 
-    async with AsyncSessionLocal() as session:
-        upload = await session.get(RawUpload, upload_id)
-        if not upload:
-            raise HTTPException(status_code=404, detail="Upload not found")
+    upload = await db.get(RawUpload, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
 
-        pipeline = ProcessingPipeline(session)
+    pipeline = ProcessingPipeline(db)
 
-        try:
-            preview = await pipeline.preview_cleaned_data(
-                upload_id, column_mapping=upload.column_mapping
-            )
-            return preview
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    try:
+        preview = await pipeline.preview_cleaned_data(
+            upload_id, column_mapping=upload.column_mapping
+        )
+        # orjson encodes the rows' datetimes and NumPy values natively
+        return ORJSONResponse(preview)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/uploads/{upload_id}/mapping")
-async def set_column_mapping(upload_id: str, mapping: dict):
+async def set_column_mapping(
+    upload_id: str, mapping: dict, db: AsyncSession = Depends(get_db)
+):
     """
     Set column mappings for processing
 
@@ -240,16 +322,15 @@ async def set_column_mapping(upload_id: str, mapping: dict):
         "sales_revenue": "total_amount"
     }
     """
-    async with AsyncSessionLocal() as session:
-        upload = await session.get(RawUpload, upload_id)
-        if not upload:
-            raise HTTPException(status_code=404, detail="Upload not found")
+    upload = await db.get(RawUpload, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
 
-        upload.column_mapping = mapping
-        await session.commit()
+    upload.column_mapping = mapping
+    await db.commit()
 
-        return {
-            "upload_id": upload_id,
-            "mapping": mapping,
-            "message": "Mapping saved successfully",
-        }
+    return {
+        "upload_id": upload_id,
+        "mapping": mapping,
+        "message": "Mapping saved successfully",
+    }
@@ -0,0 +1,104 @@
+"""
+Response Cache
+Redis-backed caching for read-heavy endpoints
+"""
+
+import functools
+import json
+import logging
+from typing import Any, Callable, Optional
+
+import redis.asyncio as redis
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Cache key templates
+SALES_SUMMARY_KEY = "sales_summary:{upload_id}"
+PREDICTION_KEY = "prediction:{model_version}:{digest}"
+UPLOAD_KEY = "upload:{upload_id}"
+SALE_KEY = "sale:{sale_id}"
+
+# Caching is disabled when no Redis URL is configured
+redis_client: Optional[redis.Redis] = (
+    redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_connect_timeout=1,
+        socket_timeout=1,
+    )
+    if settings.REDIS_URL
+    else None
+)
+
+
+async def cache_get(key: str) -> Optional[Any]:
+    """Return the cached value, or None on a miss or when Redis is unavailable"""
+    if redis_client is None:
+        return None
+    try:
+        value = await redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning("Cache read failed for %s: %s", key, e)
+        return None
+    return json.loads(value) if value is not None else None
+
+
+async def cache_set(key: str, value: Any, ttl: int) -> None:
+    """Store a JSON-serializable value for ttl seconds"""
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(key, json.dumps(value), ex=ttl)
+    except redis.RedisError as e:
+        logger.warning("Cache write failed for %s: %s", key, e)
+
+
+async def cache_delete(*keys: str) -> None:
+    """Invalidate cached entries"""
+    if redis_client is None or not keys:
+        return
+    try:
+        await redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning("Cache invalidation failed for %s: %s", keys, e)
+
+
+async def close_cache() -> None:
+    """Close the Redis connection pool"""
+    if redis_client is not None:
+        await redis_client.aclose()
+
+
+def cache(
+    key: str, ttl: int = 3600, condition: Optional[Callable[[Any], bool]] = None
+) -> Callable:
+    """
+    Cache an endpoint's result in Redis
+
+    Args:
+        key: Key template filled from the endpoint's keyword arguments,
+            e.g. "sales_summary:{upload_id}"
+        ttl: Expiry in seconds
+        condition: Only results for which this returns True are cached
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = key.format(**kwargs)
+
+            cached = await cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+            result = await func(*args, **kwargs)
+            if condition is None or condition(result):
+                await cache_set(cache_key, jsonable_encoder(result), ttl)
+            return result
+
+        return wrapper
+
+    return decorator
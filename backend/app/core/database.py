@@ -1,15 +1,47 @@
+import json
+from typing import Any, Optional
+
+import orjson
+from sqlalchemy import Select, make_url, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.sql.visitors import InternalTraversal
 
 from app.core.config import settings
 
+
+def _json_serializer(value: Any) -> str:
+    """Encode JSON columns; datetimes and NumPy scalars are handled natively"""
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    poolclass=NullPool if settings.TESTING else None,
-)
+engine_options = {
+    "echo": settings.DEBUG,
+    "json_serializer": _json_serializer,
+    "pool_pre_ping": True,
+    # Compiled SQL per statement shape, shared across requests
+    "query_cache_size": 1200,
+}
+if make_url(settings.DATABASE_URL).get_driver_name() == "asyncpg":
+    # Reuse server-side prepared statements instead of re-parsing each query
+    engine_options["connect_args"] = {
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+if settings.TESTING:
+    engine_options["poolclass"] = NullPool
+else:
+    engine_options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+
+engine = create_async_engine(settings.DATABASE_URL, **engine_options)
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
@@ -35,7 +67,93 @@ async def get_db():
             await session.close()
 
 
+def _json_to_jsonb(table: str, column: str) -> str:
+    """Convert a json column to jsonb, skipped once it already is jsonb"""
+    return (
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM information_schema.columns "
+        f"WHERE table_name = '{table}' AND column_name = '{column}' "
+        "AND data_type = 'json') THEN "
+        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb; "
+        "END IF; END $$"
+    )
+
+
+# Changes to tables that already exist, which create_all skips; each
+# statement must be safe to run on every startup
+SCHEMA_UPGRADES = [
+    "ALTER TABLE raw_uploads ADD COLUMN IF NOT EXISTS preview json",
+    # Composite (upload_id|sku_id, date DESC) indexes replace the
+    # single-column ones
+    "CREATE INDEX IF NOT EXISTS ix_sales_upload_date "
+    "ON sales_data (upload_id, date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_sales_sku_date ON sales_data (sku_id, date DESC)",
+    "DROP INDEX IF EXISTS ix_sales_data_upload_id",
+    "DROP INDEX IF EXISTS ix_sales_data_sku_id",
+    # Schema and validation report are stored as binary JSON
+    _json_to_jsonb("raw_uploads", "detected_schema"),
+    _json_to_jsonb("raw_uploads", "validation_report"),
+]
+
+
 async def init_db():
     """Initialize database tables"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        if conn.dialect.name == "postgresql":
+            for statement in SCHEMA_UPGRADES:
+                await conn.execute(text(statement))
+
+
+# Below this many (estimated) rows an exact COUNT is cheap enough to run
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+async def fast_count(session: AsyncSession, table_name: str) -> Optional[int]:
+    """
+    Approximate row count of a whole table from planner statistics
+
+    Returns None when not on PostgreSQL or the table was never analyzed.
+    """
+    if session.bind.dialect.name != "postgresql":
+        return None
+
+    result = await session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table_name"),
+        {"table_name": table_name},
+    )
+    estimate = result.scalar()
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a query, keeping its parameters bound"""
+
+    inherit_cache = True
+    _traverse_internals = [("query", InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, query: Select):
+        self.query = query
+
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.query, **kw)
+
+
+async def estimate_count(session: AsyncSession, query: Select) -> Optional[int]:
+    """
+    Planner's row estimate for a query, from EXPLAIN (FORMAT JSON)
+
+    Returns None when not on PostgreSQL.
+    """
+    if session.bind.dialect.name != "postgresql":
+        return None
+
+    # Filter values travel as bound parameters, so one prepared statement
+    # serves every value of the same query shape
+    result = await session.execute(Explain(query))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
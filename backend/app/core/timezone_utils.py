@@ -5,6 +5,7 @@ Centralized timezone handling for database operations
 from datetime import datetime, timezone
 from typing import Optional, Union
 import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
 
 
 # Default timezone for the application
@@ -24,6 +25,7 @@ def get_utc_timestamp() -> pd.Timestamp:
 def ensure_utc(dt: Optional[Union[datetime, pd.Timestamp]]) -> Optional[datetime]:
     """
     Ensure datetime is UTC timezone-aware
+    Per-value helper; for whole columns use normalize_pandas_datetime
     
     Args:
         dt: datetime or pandas Timestamp (naive or aware)
@@ -51,6 +53,7 @@ def make_naive(dt: Optional[Union[datetime, pd.Timestamp]]) -> Optional[datetime
     """
     Convert timezone-aware datetime to naive (remove timezone info)
     Used for columns stored as timestamp without time zone
+    Per-value helper; for whole columns use normalize_pandas_datetime
     
     Args:
         dt: datetime or pandas Timestamp (naive or aware)
@@ -85,11 +88,13 @@ def normalize_pandas_datetime(series: pd.Series) -> pd.Series:
     Returns:
         Series with timezone-naive UTC datetimes
     """
-    if series.dtype != 'datetime64[ns]':
+    # Any datetime64 dtype (any unit, naive or aware) skips re-parsing
+    if not is_datetime64_any_dtype(series):
         series = pd.to_datetime(series, errors='coerce')
     
-    # If timezone-aware, convert to UTC then remove tz
-    if series.dt.tz is not None:
-        series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+    # Already naive: nothing to do
+    if series.dt.tz is None:
+        return series
     
-    return series
+    # Timezone-aware: convert to UTC then remove tz
+    return series.dt.tz_convert('UTC').dt.tz_localize(None)
@@ -2,8 +2,10 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.api.v1.router import api_router
+from app.core.cache import close_cache
 from app.core.config import settings
 from app.core.database import init_db
 
@@ -15,7 +17,7 @@ async def lifespan(app: FastAPI):
     await init_db()
     yield
     # Shutdown
-    pass
+    await close_cache()
 
 
 app = FastAPI(
@@ -23,6 +25,7 @@ app = FastAPI(
     description="API for SKU prediction using PyTorch models",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
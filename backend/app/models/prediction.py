@@ -1,8 +1,24 @@
-from sqlalchemy import JSON, BigInteger, Column, DateTime, Float, Integer, String, Text
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
 
+# Binary JSON on PostgreSQL: parsed once on write instead of on every read
+JSONBType = JSON().with_variant(JSONB(), "postgresql")
+
 
 class RawUpload(Base):
     """Stores metadata about uploaded files"""
@@ -17,9 +33,10 @@ class RawUpload(Base):
     column_count = Column(Integer, nullable=True)
 
     # Schema and validation info
-    detected_schema = Column(JSON, nullable=True)
-    validation_report = Column(JSON, nullable=True)
+    detected_schema = Column(JSONBType, nullable=True)
+    validation_report = Column(JSONBType, nullable=True)
     column_mapping = Column(JSON, nullable=True)  # User-confirmed mappings
+    preview = Column(JSON, nullable=True)  # First rows, for the upload review
 
     # Status tracking
     status = Column(
@@ -31,6 +48,9 @@ class RawUpload(Base):
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     processed_at = Column(DateTime(timezone=True), nullable=True)
 
+    # Never lazy-load: uploads can own millions of rows
+    sales = relationship("SalesData", back_populates="upload", lazy="raise")
+
 
 class SalesData(Base):
     """Cleaned and processed sales data"""
@@ -38,11 +58,11 @@ class SalesData(Base):
     __tablename__ = "sales_data"
 
     id = Column(Integer, primary_key=True, index=True)
-    upload_id = Column(String(36), nullable=False, index=True)
+    upload_id = Column(String(36), ForeignKey("raw_uploads.id"), nullable=False)
 
     # Core fields
     date = Column(DateTime(timezone=False), nullable=False, index=True)
-    sku_id = Column(String(100), nullable=False, index=True)
+    sku_id = Column(String(100), nullable=False)
     sales_quantity = Column(Float, nullable=True)
     sales_revenue = Column(Float, nullable=True)
     stock_level = Column(Float, nullable=True)
@@ -54,6 +74,31 @@ class SalesData(Base):
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    upload = relationship("RawUpload", back_populates="sales")
+
+    # Sales endpoints filter by upload/SKU and page by newest date first;
+    # these also serve plain upload_id / sku_id lookups
+    __table_args__ = (
+        Index("ix_sales_upload_date", upload_id, date.desc()),
+        Index("ix_sales_sku_date", sku_id, date.desc()),
+    )
+
+
+class SalesSummary(Base):
+    """Per-upload sales aggregates, refreshed whenever an upload is processed"""
+
+    __tablename__ = "sales_summary"
+
+    upload_id = Column(String(36), ForeignKey("raw_uploads.id"), primary_key=True)
+    total_records = Column(Integer, nullable=False)
+    total_quantity = Column(Float, nullable=True)
+    total_revenue = Column(Float, nullable=True)
+    avg_quantity = Column(Float, nullable=True)
+    avg_revenue = Column(Float, nullable=True)
+    unique_skus = Column(Integer, nullable=False)
+    min_date = Column(DateTime(timezone=False), nullable=True)
+    max_date = Column(DateTime(timezone=False), nullable=True)
+
 
 class Prediction(Base):
     """Database model for storing predictions"""
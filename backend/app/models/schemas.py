@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Any
 from datetime import datetime
 
@@ -19,3 +19,18 @@ class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
     database_connected: bool
+
+class SalesOut(BaseModel):
+    """Single sales record"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    upload_id: str
+    date: datetime
+    sku_id: str
+    sales_quantity: Optional[float] = None
+    sales_revenue: Optional[float] = None
+    stock_level: Optional[float] = None
+    category: Optional[str] = None
+    unit_price: Optional[float] = None
+    created_at: Optional[datetime] = None
@@ -3,80 +3,345 @@ Data Processing Service
 Reads and processes uploaded files
 """
 
+import codecs
+import io
+import re
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Union
 
+import chardet
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 
 from app.core.timezone_utils import get_utc_timestamp
+from app.services.schema_detector import ColumnType
+
+# Column name cleanup: separators become underscores, other symbols are dropped
+SEPARATORS = str.maketrans({" ": "_", "-": "_"})
+INVALID_COLUMN_CHARS = re.compile(r"[^a-z0-9_]")
+
+# Non-null rows probed before converting a whole column, capped across
+# all columns so very wide files stay cheap to profile
+INFERENCE_SAMPLE_ROWS = 1000
+INFERENCE_MAX_CELLS = 1_000_000
+
+# Values that could be numbers start with a sign, digit or decimal point
+NUMERIC_START = re.compile(r"\s*[-+]?[\d.]")
+
+# Rows per DataFrame when streaming a file through the processing pipeline
+CHUNK_ROWS = 100_000
+
+# Leading bytes sniffed to pick a text encoding and a .txt delimiter
+ENCODING_SAMPLE_BYTES = 64 * 1024
+DELIMITER_SAMPLE_BYTES = 8 * 1024
+
+# Bytes decoded at a time when checking a whole file against its encoding
+DECODE_BLOCK_BYTES = 1024 * 1024
+
+# pyarrow CSV parse settings: bytes per parallel parse block, and the date
+# formats recognised while parsing
+ARROW_BLOCK_SIZE = 8 * 1024 * 1024
+TIMESTAMP_PARSERS = [pa_csv.ISO8601, "%m/%d/%Y"]
+
+# Date formats tried, in order, before falling back to mixed parsing
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "ISO8601"]
 
 
 class DataProcessor:
     """Process uploaded data files"""
 
     @staticmethod
-    def read_file(file_path: Path) -> pd.DataFrame:
-        """Read file based on extension"""
+    def _source(file_path: Path, content: Optional[bytes]) -> Union[Path, BinaryIO]:
+        """The file on disk, or a fresh reader over its already-loaded bytes"""
+        return file_path if content is None else io.BytesIO(content)
+
+    @staticmethod
+    def _head_bytes(file_path: Path, content: Optional[bytes], size: int) -> bytes:
+        """The first size bytes of the file"""
+        if content is not None:
+            return content[:size]
+        with open(file_path, "rb") as f:
+            return f.read(size)
+
+    @staticmethod
+    def _detect_encoding(file_path: Path, content: Optional[bytes]) -> str:
+        """Pick a text encoding from the file's first bytes"""
+        sample = DataProcessor._head_bytes(file_path, content, ENCODING_SAMPLE_BYTES)
+
+        if sample.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+        if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return "utf-16"
+
+        # Most uploads are UTF-8; a trailing multi-byte char may be cut off
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+            return "utf8"
+        except UnicodeDecodeError:
+            pass
+
+        detected = chardet.detect(sample)["encoding"]
+        return detected or "latin-1"
+
+    @staticmethod
+    def _file_encoding(file_path: Path) -> str:
+        """
+        The sniffed encoding if the whole file decodes with it, else latin-1
+
+        Matches the fallback used when the file was analyzed, for readers
+        that can't re-read rows they have already handed out.
+        """
+        encoding = DataProcessor._detect_encoding(file_path, None)
+        try:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            with open(file_path, "rb") as f:
+                while block := f.read(DECODE_BLOCK_BYTES):
+                    decoder.decode(block)
+            decoder.decode(b"", final=True)
+        except (LookupError, UnicodeDecodeError):
+            # latin-1 can decode any byte sequence
+            return "latin-1"
+        return encoding
+
+    @staticmethod
+    def _detect_delimiter(file_path: Path, content: Optional[bytes]) -> str:
+        """Tab or comma for a .txt file, whichever its first bytes use more"""
+        sample = DataProcessor._head_bytes(file_path, content, DELIMITER_SAMPLE_BYTES)
+        return "\t" if sample.count(b"\t") > sample.count(b",") else ","
+
+    @staticmethod
+    def _arrow_csv_table(
+        file_path: Path, content: Optional[bytes], encoding: str, nrows: Optional[int]
+    ) -> pa.Table:
+        """Read a whole CSV, or stream just enough batches to cover nrows"""
+        read_options = pa_csv.ReadOptions(
+            encoding=encoding, block_size=ARROW_BLOCK_SIZE
+        )
+        # Dates are typed during the parse, so inference skips those columns;
+        # blank text cells are nulls, as pandas reads them
+        convert_options = pa_csv.ConvertOptions(
+            timestamp_parsers=TIMESTAMP_PARSERS, strings_can_be_null=True
+        )
+        # Parse straight from mapped pages (or the bytes in hand) without
+        # copying the file through read() calls first
+        if content is None:
+            source = pa.memory_map(str(file_path))
+        else:
+            source = pa.BufferReader(content)
+
+        with source:
+            if nrows is None:
+                return pa_csv.read_csv(
+                    source, read_options=read_options, convert_options=convert_options
+                )
+
+            reader = pa_csv.open_csv(
+                source, read_options=read_options, convert_options=convert_options
+            )
+            batches = []
+            rows_read = 0
+            for batch in reader:
+                batches.append(batch)
+                rows_read += batch.num_rows
+                if rows_read >= nrows:
+                    break
+            return pa.Table.from_batches(batches, schema=reader.schema).slice(0, nrows)
+
+    @staticmethod
+    def _read_csv_arrow(
+        file_path: Path, content: Optional[bytes] = None, nrows: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Parse a CSV with pyarrow's multithreaded reader"""
+        encoding = DataProcessor._detect_encoding(file_path, content)
+        try:
+            table = DataProcessor._arrow_csv_table(file_path, content, encoding, nrows)
+            # Undecodable text past the sniffed bytes is inferred as binary
+            needs_fallback = any(pa.types.is_binary(f.type) for f in table.schema)
+        except (pa.ArrowInvalid, UnicodeDecodeError):
+            needs_fallback = True
+
+        if needs_fallback:
+            # latin-1 can decode any byte sequence
+            table = DataProcessor._arrow_csv_table(file_path, content, "latin-1", nrows)
+
+        # Dates come back as datetime64 columns rather than datetime.date objects
+        return table.to_pandas(
+            date_as_object=False, split_blocks=True, self_destruct=True
+        )
+
+    @staticmethod
+    def read_file(
+        file_path: Path, nrows: Optional[int] = None, content: Optional[bytes] = None
+    ) -> pd.DataFrame:
+        """
+        Read file based on extension
+
+        Args:
+            nrows: Only read the first nrows data rows (previews)
+            content: The file's bytes when already in memory; skips the disk read
+        """
         ext = file_path.suffix.lower()
+        source = DataProcessor._source
 
         if ext == ".csv":
-            # Try different encodings
-            encodings = ["utf-8", "latin-1", "iso-8859-1", "cp1252"]
-            for encoding in encodings:
-                try:
-                    return pd.read_csv(file_path, encoding=encoding)
-                except UnicodeDecodeError:
-                    continue
-            raise ValueError("Could not decode CSV file with common encodings")
+            return DataProcessor._read_csv_arrow(file_path, content, nrows=nrows)
 
         elif ext in [".xlsx", ".xls"]:
-            return pd.read_excel(file_path)
+            return pd.read_excel(
+                source(file_path, content), engine="calamine", nrows=nrows
+            )
 
         elif ext == ".txt":
-            # Try tab-delimited first, then comma
-            try:
-                return pd.read_csv(file_path, sep="\t")
-            except:
-                return pd.read_csv(file_path)
+            # Tab- or comma-delimited, decided up front so the file parses once
+            return pd.read_csv(
+                source(file_path, content),
+                sep=DataProcessor._detect_delimiter(file_path, content),
+                nrows=nrows,
+                encoding=DataProcessor._detect_encoding(file_path, content),
+            )
 
         else:
             raise ValueError(f"Unsupported file extension: {ext}")
 
+    @staticmethod
+    def read_file_chunks(
+        file_path: Path, chunk_rows: int = CHUNK_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yield the file as DataFrames of at most chunk_rows rows
+
+        CSV and .txt files are streamed so only one chunk is held in memory;
+        Excel files are read whole and yielded as a single chunk.
+        """
+        ext = file_path.suffix.lower()
+        if ext == ".csv":
+            sep = ","
+        elif ext == ".txt":
+            sep = DataProcessor._detect_delimiter(file_path, None)
+        else:
+            yield DataProcessor.read_file(file_path)
+            return
+
+        # Checked against the whole file up front: chunks already handed out
+        # can't be re-read in another encoding
+        encoding = DataProcessor._file_encoding(file_path)
+        with pd.read_csv(
+            file_path, sep=sep, encoding=encoding, chunksize=chunk_rows
+        ) as reader:
+            yield from reader
+
     @staticmethod
     def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
         """Clean and standardize column names"""
-        df.columns = df.columns.str.strip()  # Remove whitespace
-        df.columns = df.columns.str.lower()  # Lowercase
-        df.columns = df.columns.str.replace(" ", "_")  # Spaces to underscores
-        df.columns = df.columns.str.replace("-", "_")  # Hyphens to underscores
-        df.columns = df.columns.str.replace(
-            r"[^a-z0-9_]", "", regex=True
-        )  # Remove special chars
+        # strip -> lowercase -> spaces/hyphens to underscores -> drop special chars
+        df.columns = [
+            INVALID_COLUMN_CHARS.sub("", str(col).strip().lower().translate(SEPARATORS))
+            for col in df.columns
+        ]
         return df
 
+    @staticmethod
+    def _to_datetime(values: pd.Series, fmt: str) -> Optional[pd.Series]:
+        """Parse with one format (unparseable values become NaT), or None"""
+        try:
+            return pd.to_datetime(values, errors="coerce", format=fmt, dayfirst=False)
+        except (ValueError, TypeError):
+            # e.g. "Mixed timezones detected" for mixed UTC offsets
+            return None
+
+    @staticmethod
+    def _parse_dates(series: pd.Series, sample: pd.Series) -> Optional[pd.Series]:
+        """Parse dates with the first format that fits the sample, if any"""
+        # Explicit formats parse in C; "mixed" falls back to per-row parsing
+        for fmt in DATE_FORMATS + ["mixed"]:
+            parsed_sample = DataProcessor._to_datetime(sample, fmt)
+            if parsed_sample is None or parsed_sample.notna().mean() <= 0.8:
+                continue
+            parsed = DataProcessor._to_datetime(series, fmt)
+            if parsed is None:
+                continue
+
+            # Values in another shape than the majority get a per-row parse
+            # instead of silently becoming NaT
+            leftover = parsed.isna() & series.notna()
+            if fmt != "mixed" and leftover.any():
+                reparsed = DataProcessor._to_datetime(series[leftover], "mixed")
+                if reparsed is not None and reparsed.dt.tz is None:
+                    parsed[leftover] = reparsed
+            return parsed
+        return None
+
     @staticmethod
     def infer_and_convert_types(df: pd.DataFrame) -> pd.DataFrame:
         """Infer and convert column types"""
+        sample_rows = max(
+            1,
+            min(INFERENCE_SAMPLE_ROWS, INFERENCE_MAX_CELLS // max(len(df.columns), 1)),
+        )
+
         for col in df.columns:
-            # Try numeric first
-            try:
-                numeric_data = pd.to_numeric(df[col], errors="coerce")
+            series = df[col]
+
+            # Only text columns need inference; the reader typed the rest
+            if not (
+                pd.api.types.is_object_dtype(series)
+                or pd.api.types.is_string_dtype(series)
+            ):
+                continue
+
+            # Probe a sample so misses don't cost a full-column conversion
+            sample = series.dropna().head(sample_rows)
+            if sample.empty:
+                continue
+
+            # Try numeric first, unless the first value clearly isn't a number
+            if (
+                NUMERIC_START.match(str(sample.iloc[0]))
+                and pd.to_numeric(sample, errors="coerce").notna().mean() > 0.8
+            ):
+                numeric_data = pd.to_numeric(series, errors="coerce")
                 if numeric_data.notna().sum() / len(df) > 0.8:  # 80% numeric
                     df[col] = numeric_data
                     continue
-            except:
-                pass
 
-            # Try datetime with format inference
-            try:
-                date_data = pd.to_datetime(
-                    df[col], errors="coerce", format="mixed", dayfirst=False
-                )
-                if date_data.notna().sum() / len(df) > 0.8:  # 80% dates
+            # Then datetime
+            date_data = DataProcessor._parse_dates(series, sample)
+            if date_data is not None and date_data.notna().sum() / len(df) > 0.8:
+                df[col] = date_data
+
+        return df
+
+    @staticmethod
+    def apply_column_types(
+        df: pd.DataFrame, column_types: Dict[str, str]
+    ) -> pd.DataFrame:
+        """
+        Convert columns to already-detected types instead of inferring them
+
+        Args:
+            column_types: {'column_name': 'numeric'}, ColumnType values keyed
+                by cleaned column name
+        """
+        for col, col_type in column_types.items():
+            if col not in df.columns:
+                continue
+            series = df[col]
+
+            if col_type in (ColumnType.NUMERIC.value, ColumnType.INTEGER.value):
+                if not pd.api.types.is_numeric_dtype(series):
+                    df[col] = pd.to_numeric(series, errors="coerce")
+
+            elif col_type in (ColumnType.DATE.value, ColumnType.DATETIME.value):
+                if not pd.api.types.is_datetime64_any_dtype(series):
+                    sample = series.dropna().head(INFERENCE_SAMPLE_ROWS)
+                    date_data = DataProcessor._parse_dates(series, sample)
+                    if date_data is None:
+                        # Mixed UTC offsets only parse as one column in UTC
+                        date_data = pd.to_datetime(
+                            series, errors="coerce", format="mixed", utc=True
+                        )
                     df[col] = date_data
-                    continue
-            except:
-                pass
 
         return df
 
@@ -111,11 +376,22 @@ class DataProcessor:
         return df
 
     @staticmethod
-    def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-        """Apply all cleaning steps in sequence"""
+    def clean_dataframe(
+        df: pd.DataFrame, column_types: Optional[Dict[str, str]] = None
+    ) -> pd.DataFrame:
+        """
+        Apply all cleaning steps in sequence
+
+        Args:
+            column_types: Types detected for the whole file; when given they
+                replace per-frame inference, so every chunk is typed alike
+        """
         df = df.copy()
         df = DataProcessor.clean_column_names(df)
-        df = DataProcessor.infer_and_convert_types(df)
+        if column_types:
+            df = DataProcessor.apply_column_types(df, column_types)
+        else:
+            df = DataProcessor.infer_and_convert_types(df)
         df = DataProcessor.fill_missing_values(df)
         return df
 
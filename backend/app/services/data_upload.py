@@ -3,11 +3,12 @@ Data Upload Service
 Handles file uploads, storage, and processing
 """
 
+import asyncio
 import os
-import shutil
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
+import aiofiles
 import magic
 from fastapi import HTTPException, UploadFile
 
@@ -19,6 +20,14 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 
 ALLOWED_EXTENSIONS = {".csv", ".xlsx", ".xls", ".txt"}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Loading the magic database is expensive, so share one detector per process
+MIME_DETECTOR = magic.Magic(mime=True)
+
+# Uploads written to disk at the same time (bounds memory and disk pressure)
+MAX_CONCURRENT_UPLOADS = 4
+upload_slots = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
 
 
 class UploadService:
@@ -31,10 +40,19 @@ class UploadService:
         return ext in ALLOWED_EXTENSIONS
 
     @staticmethod
-    def validate_file_type(file_path: Path) -> bool:
-        """Validate actual file type using magic numbers"""
-        mime = magic.Magic(mime=True)
-        file_type = mime.from_file(str(file_path))
+    def validate_file_type(file_path: Path, content: Optional[bytes] = None) -> bool:
+        """
+        Validate actual file type using magic numbers
+
+        Args:
+            content: The file's bytes when already in memory; skips the disk read
+        """
+        # Whole file: legacy .xls (OLE2) is only told apart from other OLE
+        # documents by structures past the first few KB
+        if content is None:
+            file_type = MIME_DETECTOR.from_file(str(file_path))
+        else:
+            file_type = MIME_DETECTOR.from_buffer(content)
 
         allowed_types = {
             "text/csv",
@@ -47,8 +65,16 @@ class UploadService:
         return file_type in allowed_types or "csv" in file_type.lower()
 
     @staticmethod
-    async def save_upload_file(upload_file: UploadFile, upload_id: str) -> Path:
-        """Save uploaded file to disk"""
+    async def save_upload_file(
+        upload_file: UploadFile, upload_id: str
+    ) -> Tuple[Path, bytes]:
+        """
+        Save uploaded file to disk
+
+        Returns:
+            The stored file's path and its contents, so callers can parse the
+            upload without reading it back from disk
+        """
         # Validate extension
         if not UploadService.validate_file_extension(upload_file.filename):
             raise HTTPException(
@@ -60,10 +86,18 @@ class UploadService:
         ext = Path(upload_file.filename).suffix
         file_path = UPLOAD_DIR / f"{upload_id}{ext}"
 
-        # Save file
+        # Save file in chunks, stopping as soon as it exceeds the size limit
+        chunks = []
+        file_size = 0
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(upload_file.file, buffer)
+            async with upload_slots:
+                async with aiofiles.open(file_path, "wb") as buffer:
+                    while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                        file_size += len(chunk)
+                        if file_size > MAX_FILE_SIZE:
+                            break
+                        chunks.append(chunk)
+                        await buffer.write(chunk)
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Failed to save file: {str(e)}"
@@ -72,22 +106,22 @@ class UploadService:
             upload_file.file.close()
 
         # Check file size
-        file_size = file_path.stat().st_size
         if file_size > MAX_FILE_SIZE:
-            file_path.unlink()  # Delete file
+            file_path.unlink()  # Delete partial file
             raise HTTPException(
                 status_code=400,
                 detail=f"File too large. Max size: {MAX_FILE_SIZE / 1024 / 1024}MB",
             )
 
         # Validate file type
-        if not UploadService.validate_file_type(file_path):
+        content = b"".join(chunks)
+        if not UploadService.validate_file_type(file_path, content):
             file_path.unlink()  # Delete file
             raise HTTPException(
                 status_code=400, detail="Invalid file content. File may be corrupted."
             )
 
-        return file_path
+        return file_path, content
 
     @staticmethod
     def delete_file(file_path: Path) -> None:
@@ -2,7 +2,9 @@
 Data Validation Service
 Validates data quality and reports issues
 """
+from collections import Counter
 from typing import Dict, List, Any, Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from enum import Enum
@@ -171,10 +173,11 @@ class DataValidator:
                 continue
             
             try:
-                numeric_data = pd.to_numeric(df[col], errors='coerce')
+                # Convert once; NaN compares false in both counts below
+                values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
                 
                 # Check for negative values
-                negative_count = (numeric_data < 0).sum()
+                negative_count = np.count_nonzero(values < 0)
                 if negative_count > 0:
                     issues.append({
                         'severity': ValidationSeverity.INFO.value,
@@ -185,7 +188,7 @@ class DataValidator:
                     })
                 
                 # Check for zeros
-                zero_count = (numeric_data == 0).sum()
+                zero_count = np.count_nonzero(values == 0)
                 if zero_count > len(df) * 0.5:
                     issues.append({
                         'severity': ValidationSeverity.WARNING.value,
@@ -231,28 +234,29 @@ class DataValidator:
         numeric_cols = [c['name'] for c in schema['columns'] if c['detected_type'] in ['numeric', 'integer']]
         all_issues.extend(DataValidator.validate_numeric_values(df, numeric_cols))
         
-        # Count by severity
-        errors = [i for i in all_issues if i['severity'] == ValidationSeverity.ERROR.value]
-        warnings = [i for i in all_issues if i['severity'] == ValidationSeverity.WARNING.value]
-        infos = [i for i in all_issues if i['severity'] == ValidationSeverity.INFO.value]
+        # Count by severity in one pass
+        counts = Counter(i['severity'] for i in all_issues)
+        errors = counts[ValidationSeverity.ERROR.value]
+        warnings = counts[ValidationSeverity.WARNING.value]
+        infos = counts[ValidationSeverity.INFO.value]
         
         # Determine if valid (no errors)
-        is_valid = len(errors) == 0
+        is_valid = errors == 0
         
         # Generate summary
-        if len(errors) > 0:
-            summary = f"File has {len(errors)} error(s) that must be fixed before processing"
-        elif len(warnings) > 0:
-            summary = f"File is valid but has {len(warnings)} warning(s)"
+        if errors > 0:
+            summary = f"File has {errors} error(s) that must be fixed before processing"
+        elif warnings > 0:
+            summary = f"File is valid but has {warnings} warning(s)"
         else:
             summary = "File validation passed with no issues"
         
         return {
             'is_valid': is_valid,
             'total_issues': len(all_issues),
-            'errors': len(errors),
-            'warnings': len(warnings),
-            'infos': len(infos),
+            'errors': errors,
+            'warnings': warnings,
+            'infos': infos,
             'issues': all_issues,
             'summary': summary
         }
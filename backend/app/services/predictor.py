@@ -1,4 +1,5 @@
 # Model loading and inference logic will go here
+from functools import lru_cache
 from pathlib import Path
 
 import torch
@@ -21,9 +22,18 @@ class PredictorService:
         if model_path.exists():
             # TODO: Replace with your actual model architecture
             # self.model = YourModelClass()
-            # self.model.load_state_dict(torch.load(model_path, map_location=self.device))
+            # mmap=True keeps weights in the page cache, shared across forked workers
+            # self.model.load_state_dict(
+            #     torch.load(model_path, map_location=self.device, mmap=True)
+            # )
             # self.model.to(self.device)
             # self.model.eval()
+            # Compile once at load; reduce-overhead cuts per-call Python dispatch
+            # self.model = torch.compile(self.model, mode="reduce-overhead")
+            # Warm up with a representative input so the first request
+            # doesn't pay the compilation cost:
+            # with torch.inference_mode():
+            #     self.model(self._preprocess(SAMPLE_INPUT))
             pass
         else:
             # Model not loaded - will use placeholder predictions
@@ -48,9 +58,16 @@ class PredictorService:
             }
 
         # TODO: Implement actual prediction logic
-        # with torch.no_grad():
-        #     inputs = self._preprocess(data)
+        # inference_mode also skips autograd's view/version tracking
+        # with torch.inference_mode():
+        #     inputs = self._preprocess(data)  # torch.as_tensor(..., device=self.device)
         #     outputs = self.model(inputs)
         #     return self._postprocess(outputs)
 
         return {"prediction": "not_implemented"}
+
+
+@lru_cache()
+def get_predictor() -> PredictorService:
+    """Get the shared predictor, loading the model on first use"""
+    return PredictorService()
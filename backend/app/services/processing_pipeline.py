@@ -3,15 +3,50 @@ Processing Pipeline
 Orchestrates data cleaning and database insertion
 """
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import pandas as pd
+import pyarrow as pa
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.timezone_utils import get_utc_timestamp
-from app.models.prediction import RawUpload, SalesData
+from app.core.timezone_utils import get_utc_timestamp, normalize_pandas_datetime
+from app.models.prediction import RawUpload, SalesData, SalesSummary
 from app.services.data_processor import DataProcessor
+from app.services.schema_detector import SchemaDetector
+
+# sales_data columns written by the pipeline, in record order
+SALES_DATA_COLUMNS = [
+    "upload_id",
+    "date",
+    "sku_id",
+    "sales_quantity",
+    "unit_price",
+    "sales_revenue",
+    "stock_level",
+    "category",
+]
+
+# Rows sent per COPY / executemany call
+INSERT_BATCH_ROWS = 10_000
+
+# Rows read from the file when previewing the cleaned output
+PREVIEW_READ_ROWS = 1000
+
+
+@lru_cache(maxsize=16)
+def _read_preview_head(file_path: str, mtime: float) -> pd.DataFrame:
+    """
+    Raw (uncleaned) head of an uploaded file
+
+    Cached so repeated previews, e.g. while the user edits the column
+    mapping, skip the file read. The mtime in the key keeps a replaced file
+    from being served stale.
+    """
+    return DataProcessor.read_file(Path(file_path), nrows=PREVIEW_READ_ROWS)
 
 
 class ProcessingPipeline:
@@ -52,22 +87,35 @@ class ProcessingPipeline:
             if not file_path.exists():
                 raise FileNotFoundError(f"File not found: {file_path}")
 
-            # Read data
-            df = DataProcessor.read_file(file_path)
-            self.stats["rows_processed"] = len(df)
+            # Column types come from the whole-file analysis, not each chunk
+            column_types = self._column_types(upload)
+
+            # Stream the file through clean -> prepare -> insert one chunk at a
+            # time so memory stays bounded by the chunk size
+            for df in DataProcessor.read_file_chunks(file_path):
+                self.stats["rows_processed"] += len(df)
+
+                # Clean data
+                df = DataProcessor.clean_dataframe(df, column_types)
+                if not column_types:
+                    # No stored schema: type later chunks like the first
+                    column_types = {
+                        col: SchemaDetector.detect_column_type(df[col]).value
+                        for col in df.columns
+                    }
 
-            # Clean data
-            df = DataProcessor.clean_dataframe(df)
+                # Apply column mapping if provided
+                if column_mapping:
+                    df = DataProcessor.standardize_column_mapping(df, column_mapping)
 
-            # Apply column mapping if provided
-            if column_mapping:
-                df = DataProcessor.standardize_column_mapping(df, column_mapping)
+                # Prepare for database
+                df = DataProcessor.prepare_for_database(df)
 
-            # Prepare for database
-            df = DataProcessor.prepare_for_database(df)
+                # Insert into sales_data (committed per chunk)
+                await self._insert_to_database(df, upload_id)
 
-            # Insert into sales_data
-            await self._insert_to_database(df, upload_id)
+            # Recompute the upload's aggregates for the summary endpoint
+            await self.refresh_summary(upload_id)
 
             # Update upload status
             upload.status = "processed"
@@ -78,6 +126,12 @@ class ProcessingPipeline:
             return self.stats
 
         except Exception as e:
+            # Drop rows from chunks committed before the failure so a retry
+            # starts clean
+            await self.session.rollback()
+            await self.session.execute(
+                delete(SalesData).where(SalesData.upload_id == upload_id)
+            )
             upload.status = "error"
             upload.error_message = str(e)
             await self.session.commit()
@@ -85,30 +139,99 @@ class ProcessingPipeline:
             self.stats["success"] = False
             raise
 
+    @staticmethod
+    def _column_types(upload: RawUpload) -> Dict[str, str]:
+        """Detected type per cleaned column name, from the upload's schema"""
+        columns = (upload.detected_schema or {}).get("columns", [])
+        return {column["name"]: column["detected_type"] for column in columns}
+
     async def _insert_to_database(self, df: pd.DataFrame, upload_id: str):
         """Insert cleaned data into sales_data table"""
-        records = []
-
-        for _, row in df.iterrows():
-            record = SalesData(
-                upload_id=upload_id,
-                date=row.get("date"),
-                sku_id=row.get("sku_id"),
-                sales_quantity=float(row.get("sales_quantity", 0)),
-                unit_price=float(row.get("unit_price", 0)),
-                sales_revenue=float(row.get("sales_revenue", 0)),
-                stock_level=int(row.get("stock_level", 0))
-                if pd.notna(row.get("stock_level"))
-                else 0,
-                category=str(row.get("category", "")),
-            )
-            records.append(record)
-
-        # Bulk insert
-        self.session.add_all(records)
+        # Cast whole columns once instead of boxing every cell per row
+        typed = pd.DataFrame(
+            {
+                "upload_id": upload_id,
+                # Naive UTC for the timestamp-without-time-zone column
+                "date": normalize_pandas_datetime(df["date"]),
+                "sku_id": df["sku_id"].astype(str),
+                "sales_quantity": df["sales_quantity"].astype("float64"),
+                "unit_price": df["unit_price"].astype("float64"),
+                "sales_revenue": df["sales_revenue"].astype("float64"),
+                "stock_level": df["stock_level"].fillna(0).astype("int64"),
+                "category": df["category"].astype(str),
+            },
+            columns=SALES_DATA_COLUMNS,
+        )
+        table = pa.Table.from_pandas(typed, preserve_index=False)
+
+        # Unbox one Arrow column at a time, then pair values into rows
+        record_batches = (
+            list(zip(*(column.to_pylist() for column in batch.columns)))
+            for batch in table.to_batches(max_chunksize=INSERT_BATCH_ROWS)
+        )
+
+        conn = await self.session.connection()
+        if conn.dialect.driver == "asyncpg":
+            raw_conn = await conn.get_raw_connection()
+            driver_conn = raw_conn.driver_connection
+            # SQLAlchemy only opens a transaction for statements it runs
+            # itself, so without this block each COPY would autocommit
+            async with driver_conn.transaction():
+                for records in record_batches:
+                    # COPY skips per-row INSERT parsing and protocol round-trips
+                    await driver_conn.copy_records_to_table(
+                        SalesData.__tablename__,
+                        records=records,
+                        columns=SALES_DATA_COLUMNS,
+                    )
+        else:
+            for records in record_batches:
+                await self.session.execute(
+                    insert(SalesData),
+                    [dict(zip(SALES_DATA_COLUMNS, record)) for record in records],
+                )
         await self.session.commit()
 
-        self.stats["rows_inserted"] = len(records)
+        self.stats["rows_inserted"] += table.num_rows
+
+    async def refresh_summary(self, upload_id: str):
+        """
+        Aggregate the upload's sales_data rows into its sales_summary row
+
+        Runs as a single INSERT ... SELECT so the rows never leave the
+        database. Uploads without sales rows get no summary row.
+        """
+        aggregates = (
+            select(
+                SalesData.upload_id,
+                func.count(),
+                func.sum(SalesData.sales_quantity),
+                func.sum(SalesData.sales_revenue),
+                func.avg(SalesData.sales_quantity),
+                func.avg(SalesData.sales_revenue),
+                func.count(func.distinct(SalesData.sku_id)),
+                func.min(SalesData.date),
+                func.max(SalesData.date),
+            )
+            .where(SalesData.upload_id == upload_id)
+            .group_by(SalesData.upload_id)
+        )
+        columns = [column.name for column in SalesSummary.__table__.columns]
+
+        conn = await self.session.connection()
+        if conn.dialect.name == "postgresql":
+            stmt = pg_insert(SalesSummary).from_select(columns, aggregates)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SalesSummary.upload_id],
+                set_={name: stmt.excluded[name] for name in columns[1:]},
+            )
+        else:
+            await self.session.execute(
+                delete(SalesSummary).where(SalesSummary.upload_id == upload_id)
+            )
+            stmt = insert(SalesSummary).from_select(columns, aggregates)
+
+        await self.session.execute(stmt)
 
     async def preview_cleaned_data(
         self, upload_id: str, column_mapping: Dict[str, str] = None
@@ -123,35 +246,25 @@ class ProcessingPipeline:
         if not upload:
             raise ValueError(f"Upload {upload_id} not found")
 
+        # Only the head of the file is needed; inference runs on these rows too
         file_path = Path(upload.file_path)
-        df = DataProcessor.read_file(file_path)
+        df = _read_preview_head(str(file_path), file_path.stat().st_mtime)
 
-        # Clean
-        df = DataProcessor.clean_dataframe(df)
+        # Clean (works on a copy, so the cached frame stays untouched), typed
+        # as processing will type the whole file
+        df = DataProcessor.clean_dataframe(df, self._column_types(upload))
 
         if column_mapping:
             df = DataProcessor.standardize_column_mapping(df, column_mapping)
 
         df = DataProcessor.prepare_for_database(df)
 
-        # Convert to dict for JSON response
-        records = df.head(20).to_dict("records")
-
-        # Handle NaN values for JSON
-        clean_records = []
-        for record in records:
-            clean_record = {}
-            for k, v in record.items():
-                if pd.isna(v):
-                    clean_record[k] = None
-                elif isinstance(v, pd.Timestamp):
-                    clean_record[k] = v.isoformat()
-                else:
-                    clean_record[k] = v
-            clean_records.append(clean_record)
+        # Convert to JSON-ready rows (nulls as None)
+        records = SchemaDetector.generate_preview(df, rows=20)
 
         return {
-            "preview": clean_records,
-            "total_rows": len(df),
+            "preview": records,
+            # Counted during upload analysis; the preview only reads the head
+            "total_rows": upload.row_count or len(df),
             "columns": list(df.columns),
         }
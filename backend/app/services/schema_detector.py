@@ -3,12 +3,33 @@ Schema Detection Service
 Automatically detects column types and suggests schema mappings
 """
 
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+# Threads profiling columns in parallel
+SCHEMA_WORKERS = min(8, os.cpu_count() or 1)
+
+# Non-null values inspected when inferring a column's type
+TYPE_SAMPLE_ROWS = 100
+
+# Date shapes seen in uploads: ISO-8601 (2024-03-01) or US style (3/1/2024),
+# optionally followed by a time of day and UTC offset; matched against the
+# whole value so codes like 2023-10-0001 stay strings
+DATE_PATTERN = re.compile(
+    r"(?:\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}/\d{2,4})"
+    r"(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?"
+)
+# Time of day following a date, e.g. "2024-03-01 14:30:00" or "...T14:30"
+TIME_PATTERN = re.compile(r"[ T](\d{1,2}):(\d{2})(?::(\d{2}))?")
 
 
 class ColumnType(str, Enum):
@@ -45,39 +66,49 @@ class SchemaDetector:
         "category": ["category", "type", "group", "department", "class", "segment"],
     }
 
+    # One precompiled alternation per field, tried in COLUMN_KEYWORDS order
+    KEYWORD_PATTERNS = [
+        (field, re.compile("|".join(map(re.escape, keywords))))
+        for field, keywords in COLUMN_KEYWORDS.items()
+    ]
+
     @staticmethod
-    def detect_column_type(series: pd.Series) -> ColumnType:
-        """Detect the type of a pandas Series"""
-        # Drop nulls for type detection
-        non_null = series.dropna()
+    def _numeric_type(values: pd.Series) -> ColumnType:
+        """INTEGER when every value is a finite whole number, else NUMERIC"""
+        array = values.to_numpy(dtype=float)
+        if np.isfinite(array).all() and (array % 1 == 0).all():
+            return ColumnType.INTEGER
+        return ColumnType.NUMERIC
 
-        if len(non_null) == 0:
-            return ColumnType.UNKNOWN
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _infer_from_sample(dtype: str, sample: Tuple[Any, ...]) -> Optional[ColumnType]:
+        """
+        Infer a column type from a sample of its non-null values
 
-        # Try datetime first
-        try:
-            pd.to_datetime(non_null, errors="raise", format="mixed")
+        Memoized on (dtype, sample): repeated uploads of the same layout skip
+        the parsing entirely. Returns None when only the full column can tell
+        (categorical vs string).
+        """
+        values = pd.Series(sample)
+
+        # Try datetime first: recognise date-shaped text without running the
+        # (dateutil-backed) datetime parser
+        text = values.astype(str)
+        if text.str.fullmatch(DATE_PATTERN).mean() > 0.9:
             # Check if it's date only or datetime
-            sample = pd.to_datetime(non_null.iloc[0], format="mixed")
-            if sample.hour == 0 and sample.minute == 0 and sample.second == 0:
+            time = TIME_PATTERN.search(text.iloc[0])
+            if time is None or not any(int(part or 0) for part in time.groups()):
                 return ColumnType.DATE
             return ColumnType.DATETIME
-        except:
-            pass
 
         # Try numeric
-        try:
-            numeric_series = pd.to_numeric(non_null, errors="coerce")
-            if numeric_series.notna().all():
-                # Check if integer
-                if (numeric_series == numeric_series.astype(int)).all():
-                    return ColumnType.INTEGER
-                return ColumnType.NUMERIC
-        except:
-            pass
+        numeric_series = pd.to_numeric(values, errors="coerce")
+        if numeric_series.notna().all():
+            return SchemaDetector._numeric_type(numeric_series)
 
         # Try boolean
-        if non_null.isin(
+        if values.isin(
             [
                 True,
                 False,
@@ -95,6 +126,35 @@ class SchemaDetector:
         ).all():
             return ColumnType.BOOLEAN
 
+        return None
+
+    @staticmethod
+    def detect_column_type(series: pd.Series) -> ColumnType:
+        """Detect the type of a pandas Series"""
+        # Drop nulls for type detection
+        non_null = series.dropna()
+
+        if len(non_null) == 0:
+            return ColumnType.UNKNOWN
+
+        # Columns the reader already typed need no parsing at all
+        if pd.api.types.is_bool_dtype(series):
+            return ColumnType.BOOLEAN
+        if pd.api.types.is_numeric_dtype(series):
+            return SchemaDetector._numeric_type(non_null)
+        if pd.api.types.is_datetime64_any_dtype(series):
+            # Check if it's date only or datetime
+            first = non_null.iloc[0]
+            if first == first.normalize():
+                return ColumnType.DATE
+            return ColumnType.DATETIME
+
+        # Date, numeric and boolean checks only need a small sample
+        sample = tuple(non_null.head(TYPE_SAMPLE_ROWS).tolist())
+        sampled_type = SchemaDetector._infer_from_sample(str(series.dtype), sample)
+        if sampled_type is not None:
+            return sampled_type
+
         # Check if categorical (low cardinality)
         unique_ratio = non_null.nunique() / len(non_null)
         if unique_ratio < 0.1 and non_null.nunique() < 50:
@@ -103,17 +163,42 @@ class SchemaDetector:
         return ColumnType.STRING
 
     @staticmethod
+    @lru_cache(maxsize=1024)
     def suggest_column_mapping(column_name: str) -> Optional[str]:
         """Suggest what a column might be based on its name"""
         col_lower = column_name.lower().replace(" ", "_").replace("-", "_")
 
-        for field, keywords in SchemaDetector.COLUMN_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in col_lower:
-                    return field
+        # The first field with any keyword in the name wins
+        for field, pattern in SchemaDetector.KEYWORD_PATTERNS:
+            if pattern.search(col_lower):
+                return field
 
         return None
 
+    @staticmethod
+    def _profile_column(series: pd.Series, col: str) -> Dict[str, Any]:
+        """Type, suggested mapping and null/unique stats for one column"""
+        col_type = SchemaDetector.detect_column_type(series)
+        suggested = SchemaDetector.suggest_column_mapping(col)
+
+        # One null mask feeds the null, unique and sample stats
+        isna = series.isna().to_numpy()
+        null_count = int(isna.sum())
+        non_null = series[~isna]
+
+        # Get sample values (non-null), as strings for JSON serialization
+        sample_values = non_null.head(5).astype(str).tolist()
+
+        return {
+            "name": col,
+            "detected_type": col_type.value,
+            "suggested_mapping": suggested,
+            "null_count": null_count,
+            "null_percentage": null_count / len(series) * 100 if len(series) else 0.0,
+            "unique_count": len(pd.unique(non_null)),
+            "sample_values": sample_values,
+        }
+
     @staticmethod
     def detect_schema(df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -136,41 +221,30 @@ class SchemaDetector:
                 'suggested_sku_column': 'sku_id'
             }
         """
-        columns = []
+        # Column stats run in NumPy/pandas C code that releases the GIL
+        with ThreadPoolExecutor(max_workers=SCHEMA_WORKERS) as executor:
+            columns = list(
+                executor.map(
+                    SchemaDetector._profile_column,
+                    (df[col] for col in df.columns),
+                    df.columns,
+                )
+            )
+
+        # Track suggested key columns
         suggested_date = None
         suggested_sku = None
-
-        for col in df.columns:
-            series = df[col]
-            col_type = SchemaDetector.detect_column_type(series)
-            suggested = SchemaDetector.suggest_column_mapping(col)
-
-            # Get sample values (non-null)
-            sample_values = series.dropna().head(5).tolist()
-            # Convert to string for JSON serialization
-            sample_values = [str(v) for v in sample_values]
-
-            column_info = {
-                "name": col,
-                "detected_type": col_type.value,
-                "suggested_mapping": suggested,
-                "null_count": int(series.isna().sum()),
-                "null_percentage": float(series.isna().sum() / len(series) * 100),
-                "unique_count": int(series.nunique()),
-                "sample_values": sample_values,
-            }
-
-            columns.append(column_info)
-
-            # Track suggested key columns
+        for column_info in columns:
+            suggested = column_info["suggested_mapping"]
             if (
                 suggested == "date"
                 and not suggested_date
-                and col_type in [ColumnType.DATE, ColumnType.DATETIME]
+                and column_info["detected_type"]
+                in [ColumnType.DATE.value, ColumnType.DATETIME.value]
             ):
-                suggested_date = col
+                suggested_date = column_info["name"]
             if suggested == "sku" and not suggested_sku:
-                suggested_sku = col
+                suggested_sku = column_info["name"]
 
         return {
             "columns": columns,
@@ -184,24 +258,25 @@ class SchemaDetector:
     @staticmethod
     def generate_preview(df: pd.DataFrame, rows: int = 10) -> List[Dict]:
         """Generate preview data for frontend"""
-        preview_df = df.head(rows).copy()
-
-        # Convert to dict with NaN handling
-        records = preview_df.to_dict("records")
-
-        # Replace NaN, NaT, and Inf values with None
-        cleaned_records = []
-        for record in records:
-            cleaned = {}
-            for key, value in record.items():
-                if pd.isna(value):
-                    cleaned[key] = None
-                elif isinstance(value, float) and (np.isinf(value) or np.isnan(value)):
-                    cleaned[key] = None
-                elif isinstance(value, pd.Timestamp):
-                    cleaned[key] = value.isoformat()
-                else:
-                    cleaned[key] = value
-            cleaned_records.append(cleaned)
-
-        return cleaned_records
+        # Inf has no JSON form; NaN and NaT become None in the Arrow conversion
+        preview_df = df.head(rows).replace([np.inf, -np.inf], np.nan)
+
+        # Arrow returns ns-unit timestamps as pandas.Timestamp, which orjson
+        # can't encode; at microsecond precision they come back as datetimes
+        datetime_columns = preview_df.select_dtypes(
+            include=["datetime", "datetimetz"]
+        ).columns
+        for col in datetime_columns:
+            preview_df[col] = preview_df[col].dt.as_unit("us")
+
+        try:
+            table = pa.Table.from_pandas(preview_df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Object columns mixing types (e.g. from Excel) preview as text
+            text_columns = preview_df.select_dtypes(include="object").columns
+            table = pa.Table.from_pandas(
+                preview_df.astype({col: "string" for col in text_columns}),
+                preserve_index=False,
+            )
+
+        return table.to_pylist()
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from app.services.data_processor import DataProcessor
+
+
+def test_dates_outside_the_majority_format_are_kept():
+    """One US-style date among ISO dates parses instead of becoming NaT"""
+    df = pd.DataFrame(
+        {
+            "date": [f"2024-03-0{day}" for day in range(1, 10)] + ["03/20/2024"],
+            "timestamp": ["2024-03-01"] * 9 + ["2024-03-02 14:30:00"],
+        },
+        dtype=object,
+    )
+
+    cleaned = DataProcessor.clean_dataframe(df)
+
+    assert cleaned["date"].iloc[-1] == pd.Timestamp("2024-03-20")
+    assert cleaned["timestamp"].iloc[-1] == pd.Timestamp("2024-03-02 14:30:00")
+
+    typed = DataProcessor.clean_dataframe(
+        df, column_types={"date": "date", "timestamp": "datetime"}
+    )
+    assert typed["date"].iloc[-1] == pd.Timestamp("2024-03-20")
+    assert typed["timestamp"].iloc[-1] == pd.Timestamp("2024-03-02 14:30:00")
+
+
+def test_mixed_utc_offsets():
+    """Mixed offsets stay text when inferred, and parse in UTC when typed"""
+    values = ["2024-03-01T10:00:00Z", "2024-03-01T10:00:00+02:00"] * 5
+    df = pd.DataFrame({"date": values}, dtype=object)
+
+    inferred = DataProcessor.infer_and_convert_types(df.copy())
+    assert inferred["date"].tolist() == values
+
+    typed = DataProcessor.apply_column_types(df.copy(), {"date": "date"})
+    assert typed["date"].iloc[1] == pd.Timestamp("2024-03-01 08:00:00", tz="UTC")
@@ -0,0 +1,22 @@
+from pathlib import Path
+
+import pytest
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def upload_service(tmp_path, monkeypatch):
+    """UploadService, imported where its uploads directory can be created"""
+    monkeypatch.chdir(tmp_path)
+    from app.services.data_upload import UploadService
+
+    return UploadService
+
+
+def test_validate_file_type_accepts_legacy_xls(upload_service):
+    """OLE2 .xls files are recognised past the generic x-ole-storage header"""
+    file_path = FIXTURES / "sales.xls"
+
+    assert upload_service.validate_file_type(file_path, file_path.read_bytes())
+    assert upload_service.validate_file_type(file_path)
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import orjson
+import pandas as pd
+
+from app.services.schema_detector import SchemaDetector
+
+
+def test_generate_preview_serializes_ns_datetimes():
+    """ns-unit columns (pd.read_excel, pd.to_datetime on pandas 2) encode as JSON"""
+    df = pd.DataFrame(
+        {
+            "date": pd.Series(
+                ["2024-03-01", None, "2024-03-03"], dtype="datetime64[ns]"
+            ),
+            "created_at": pd.Series(
+                ["2024-03-01 14:30:00"] * 3, dtype="datetime64[ns]"
+            ).dt.tz_localize("UTC"),
+            "sales_quantity": [1, 2, 3],
+        }
+    )
+
+    preview = SchemaDetector.generate_preview(df, rows=2)
+
+    assert preview == [
+        {
+            "date": datetime(2024, 3, 1),
+            "created_at": datetime(2024, 3, 1, 14, 30, tzinfo=timezone.utc),
+            "sales_quantity": 1,
+        },
+        {
+            "date": None,
+            "created_at": datetime(2024, 3, 1, 14, 30, tzinfo=timezone.utc),
+            "sales_quantity": 2,
+        },
+    ]
+    assert orjson.loads(orjson.dumps(preview))[0]["date"] == "2024-03-01T00:00:00"
+    # The caller's frame keeps its original unit
+    assert df["date"].dtype == "datetime64[ns]"
@@ -1,6 +1,9 @@
 import { useState, useCallback } from 'react';
 import { Upload, FileText, X, CheckCircle, AlertCircle, Loader2 } from 'lucide-react';
 
+const POLL_INTERVAL_MS = 1000;
+const MAX_POLL_ATTEMPTS = 300;
+
 interface UploadResponse {
   upload_id: string;
   filename: string;
@@ -96,6 +99,29 @@ export function FileUpload() {
     setUploadResult(null);
   };
 
+  // The backend analyzes files in the background; poll until it is done,
+  // giving up after a few minutes
+  const waitForAnalysis = async (uploadId: string): Promise<UploadResponse> => {
+    for (let attempt = 0; attempt < MAX_POLL_ATTEMPTS; attempt++) {
+      const response = await fetch(`${API_URL}/api/v1/upload/uploads/${uploadId}`);
+      if (!response.ok) {
+        throw new Error('Failed to fetch upload status');
+      }
+
+      const upload = await response.json();
+      if (upload.status === 'error') {
+        throw new Error(upload.error_message || 'Upload failed');
+      }
+      if (upload.status !== 'processing') {
+        return upload;
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+    }
+
+    throw new Error('Timed out waiting for the file to be analyzed');
+  };
+
   const handleUpload = async () => {
     if (!file) return;
     
@@ -116,8 +142,8 @@ export function FileUpload() {
         throw new Error(errorData.detail || 'Upload failed');
       }
       
-      const result = await response.json();
-      setUploadResult(result);
+      const { upload_id } = await response.json();
+      setUploadResult(await waitForAnalysis(upload_id));
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Upload failed');
     } finally {